@@ -121,3 +121,10 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Nameservice
+
+# Seconds a worker keeps the compiled name patterns and artifact criteria.
+# Changes are seen earlier by all workers when CACHES is a shared backend.
+NAMESERVICE_CACHE_TTL = 60
@@ -1,5 +1,25 @@
+import os
+
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class NameserviceConfig(AppConfig):
     name = 'nameservice'
+
+    def ready(self):
+        from . import registry
+
+        NamePattern = self.get_model('NamePattern')
+        NameArtifactsCategory = self.get_model('NameArtifactsCategory')
+
+        for signal in (post_save, post_delete):
+            signal.connect(registry.invalidate, sender=NamePattern,
+                           dispatch_uid='nameservice_invalidate_patterns')
+            signal.connect(registry.invalidate, sender=NameArtifactsCategory,
+                           dispatch_uid='nameservice_invalidate_criteria')
+
+        # the caches are warmed by registry.warm_in_background after
+        # the fork, a forked child starts with empty caches.
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=registry.reset)
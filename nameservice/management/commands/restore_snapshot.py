@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from nameservice import snapshot
+
+
+class Command(BaseCommand):
+    help = "Bulk inserts a snapshot file into empty tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the snapshot file")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database to restore into")
+
+    def handle(self, *args, **options):
+        try:
+            counts = snapshot.restore_file(options['path'], using=options['database'])
+        except snapshot.SnapshotError as e:
+            raise CommandError(e)
+
+        for label, count in counts.items():
+            self.stdout.write("  {0:<40} {1:>10}".format(label, count))
+        self.stdout.write("Restored {0} rows from {1}".format(sum(counts.values()), options['path']))
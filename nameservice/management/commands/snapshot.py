@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from nameservice import snapshot
+
+
+class Command(BaseCommand):
+    help = "Writes the pool state to a compressed snapshot file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the snapshot file, e.g. pool.jsonl.gz")
+        parser.add_argument('app_labels', nargs='*', default=snapshot.SNAPSHOT_APPS,
+                            help="Apps to include (default: {0})".format(
+                                 ", ".join(snapshot.SNAPSHOT_APPS)))
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database to read from")
+
+    def handle(self, *args, **options):
+        counts = snapshot.dump_file(options['path'], options['app_labels'],
+                                    using=options['database'])
+        for label, count in counts.items():
+            self.stdout.write("  {0:<40} {1:>10}".format(label, count))
+        self.stdout.write("Wrote {0} rows to {1}".format(sum(counts.values()), options['path']))
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nameservice import registry
+
+
+# runs django.setup() in a fresh interpreter and reports the
+# time spent importing the models module of each installed app.
+PROFILE_SCRIPT = """
+import json, sys, time
+from django.apps.config import AppConfig
+
+timings = []
+import_models = AppConfig.import_models
+
+def timed_import_models(self):
+    start = time.perf_counter()
+    import_models(self)
+    timings.append((self.name, time.perf_counter() - start))
+
+AppConfig.import_models = timed_import_models
+
+start = time.perf_counter()
+import django
+django.setup()
+timings.append(('total', time.perf_counter() - start))
+
+json.dump(timings, sys.stdout)
+"""
+
+WARMUPS = [
+    ('patterns', registry.clear_patterns, registry.warm_patterns),
+    ('criteria', registry.clear_criteria, registry.warm_criteria),
+]
+
+
+class Command(BaseCommand):
+    help = "Reports the import and cache warm-up time per component."
+
+    def handle(self, *args, **options):
+
+        self.stdout.write("Import time (models per app):")
+        for name, elapsed in self.profile_imports():
+            self.stdout.write("  {0:<32} {1:>10.1f} ms".format(name, elapsed * 1000))
+
+        self.stdout.write("Warm-up time:")
+        for name, clear, warm in WARMUPS:
+            clear()
+            start = time.perf_counter()
+            warm()
+            elapsed = time.perf_counter() - start
+            self.stdout.write("  {0:<32} {1:>10.1f} ms".format(name, elapsed * 1000))
+
+    def profile_imports(self):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'django_dnspool.settings')
+
+        proc = subprocess.run([sys.executable, '-c', PROFILE_SCRIPT],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True, env=env,
+                              cwd=settings.BASE_DIR)
+        if proc.returncode:
+            raise CommandError("Django setup failed:\n{0}".format(proc.stderr))
+
+        return json.loads(proc.stdout)
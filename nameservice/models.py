@@ -1,6 +1,11 @@
-from django.db import models
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.utils.translation import gettext as _
 
+from . import registry
+
 # Create your models here.
 
 
@@ -43,45 +48,64 @@ class NamePoolEntry(models.Model):
             of a pool type and saves the entry together with all of
             its artifacts. """
 
-        from django.core.exceptions import ValidationError
-        from .models import NamePattern
-        import re
-
         match = None
 
-        patterns = NamePattern.objects.filter(pool_type=pool_type)
-        for pattern in patterns:
+        # the cached patterns may be stale, a name that does not
+        # match them is checked again against the stored patterns.
+        for refresh in (False, True):
+
+            patterns = registry.get_patterns(self.pool_type_id, refresh=refresh)
+            for regex, c in patterns:
 
-            c = re.compile(pattern.regex, re.VERBOSE)
-            match = c.match(self.name)
+                match = c.match(self.name)
+
+                if match:
+                    break
 
             if match:
                 break
 
-            if not match:
-                msg = _("The name {0} does not match with any of these patterns: {1}".format(self.name,
-                            "\n\n".join(patterns.values_list('regex', flat=True))))
-                raise ValidationError(msg)
-
+        if not match:
+            msg = _("The name {0} does not match with any of these patterns: {1}".format(self.name,
+                        "\n\n".join(r for r, c in patterns)))
+            raise ValidationError(msg)
 
-        super(NamePoolEntry, self).save()
 
         data = match.groupdict()
 
-        for c,a in data.items():
+        with transaction.atomic():
 
-            criteria, created = NameArtifactsCategory.objects.get_or_create(criteria=c)
+            super(NamePoolEntry, self).save()
 
-            if not a and criteria.default:
-                artifact, created = NameArtifacts.objects.get_or_create(
-                    artifact=criteria.default,
-                    criteria=c)
-            elif a:
-                artifact, created = NameArtifacts.objects.get_or_create(
-                    artifact=a,
-                    criteria=c)
+            # the cached categories may have been changed or deleted by
+            # another process, they are checked with a single query.
+            categories = registry.get_criteria()
+            cached = {(c,) + categories[c] for c in data if c in categories}
+            stored = NameArtifactsCategory.objects.filter(pk__in=[pk for c, pk, d in cached]) \
+                                                  .values_list('criteria', 'pk', 'default')
+            if cached and set(stored) != cached:
+                categories = registry.get_criteria(refresh=True)
 
-            artifact.dns_pool_entries.add(self)
+            for c,a in data.items():
+
+                if c in categories:
+                    criteria_id, default = categories[c]
+                else:
+                    criteria, created = NameArtifactsCategory.objects.get_or_create(criteria=c)
+                    criteria_id, default = criteria.pk, criteria.default
+
+                if not a and default:
+                    artifact, created = NameArtifacts.objects.get_or_create(
+                        artifact=default,
+                        criteria_id=criteria_id)
+                elif a:
+                    artifact, created = NameArtifacts.objects.get_or_create(
+                        artifact=a,
+                        criteria_id=criteria_id)
+                else:
+                    continue
+
+                artifact.related_entries.add(self)
 
 
 class NameArtifactsCategory(models.Model):
@@ -123,23 +147,23 @@ class NamingScheme(models.Model):
         """
 
     scheme = models.CharField(max_length=150,
-        help_text=_("Concat the naming scheme using python format expression 
-                    e.g ''{foo}{bar}ize'"),
+        help_text=_("Concat the naming scheme using python format expression "
+                    "e.g ''{type}{farm}foo'"),
         verbose_name=_("Name Scheme"))
     description = models.TextField(blank=True, verbose_name=_("Description"))
 
 
     def save(self):
-        from django.core.exceptions import ValidationError
-        from .models import NameArtifactsCategory
-        import re
+        wanted_subs = re.findall(r'({\w+})', self.scheme)
 
-        valid_subs = list("{{{0}}}".format(c) for c in \
-                        NameArtifactsCategory.objects.all().values_list('criteria', flat=True))
+        for refresh in (False, True):
 
-        wanted_subs = re.findall(r'({\w+})', self.scheme)
+            valid_subs = list("{{{0}}}".format(c) for c in registry.get_criteria(refresh=refresh))
+
+            if any(e in wanted_subs for e in valid_subs):
+                break
 
-        if not any(e in wanted_subs for e in valid_subs):
+        else:
             msg = "Some of this substitutions are not allowed: {0} \
                    Valid Subsitutions are: {1}".format(wanted_subs, ", ".join(valid_subs))
             raise ValidationError(msg)
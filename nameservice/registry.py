@@ -0,0 +1,157 @@
+import logging
+import re
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+# in-process caches of the name patterns and artifact criteria.
+# they are filled lazily on first use (or by warm_in_background) and
+# hold for at most NAMESERVICE_CACHE_TTL seconds. a version key in the
+# django cache is bumped on every committed change, so with a shared
+# cache backend the other processes reload on their next read.
+
+VERSION_KEY = 'nameservice.registry.version'
+
+_lock = threading.RLock()
+_generation = 0
+_entries = {}
+
+
+def _fresh(entry, version):
+    ttl = getattr(settings, 'NAMESERVICE_CACHE_TTL', 60)
+    return entry is not None and entry[0] == version and \
+        time.monotonic() - entry[1] < ttl
+
+
+def _cached(key, load, refresh=False):
+    version = cache.get(VERSION_KEY)
+    entry = _entries.get(key)
+    if not refresh and _fresh(entry, version):
+        return entry[2]
+
+    with _lock:
+        generation = _generation
+
+    value = load()
+
+    with _lock:
+        # do not keep what was loaded while the caches were cleared
+        if generation == _generation:
+            _entries[key] = (version, time.monotonic(), value)
+
+    return value
+
+
+def get_patterns(pool_type_id, refresh=False):
+    """ returns a list of (regex, compiled pattern) tuples
+        of all name patterns belonging to a pool type. """
+
+    def load():
+        NamePattern = apps.get_model('nameservice', 'NamePattern')
+        regexes = NamePattern.objects.filter(criteria_id=pool_type_id) \
+                                     .values_list('regex', flat=True)
+        return [(r, re.compile(r, re.VERBOSE)) for r in regexes]
+
+    return _cached(('patterns', pool_type_id), load, refresh)
+
+
+def get_criteria(refresh=False):
+    """ returns a dict mapping each artifact criteria
+        to its (pk, default) tuple. """
+
+    def load():
+        NameArtifactsCategory = apps.get_model('nameservice', 'NameArtifactsCategory')
+        return {c: (pk, d) for pk, c, d in
+                NameArtifactsCategory.objects.values_list('pk', 'criteria', 'default')}
+
+    return _cached(('criteria',), load, refresh)
+
+
+def warm_patterns():
+    """ compiles the name patterns of all pool types. """
+
+    NamePattern = apps.get_model('nameservice', 'NamePattern')
+    pool_types = NamePattern.objects.values_list('criteria_id', flat=True).distinct()
+    for pool_type_id in pool_types:
+        get_patterns(pool_type_id)
+
+
+def warm_criteria():
+    get_criteria()
+
+
+def warm():
+    warm_patterns()
+    warm_criteria()
+
+
+def warm_in_background():
+    """ warms the caches in a daemon thread. call it in the worker
+        after the fork, e.g. from the gunicorn post_worker_init hook,
+        never from a preloading master. """
+
+    thread = threading.Thread(target=_warm, daemon=True, name='nameservice-warmup')
+    thread.start()
+    return thread
+
+
+def _warm():
+    try:
+        warm()
+    except Exception:
+        logger.exception("Warming the nameservice caches failed.")
+        clear()
+    finally:
+        connection.close()
+
+
+def clear_patterns():
+    global _generation
+
+    with _lock:
+        _generation += 1
+        for key in [k for k in _entries if k[0] == 'patterns']:
+            del _entries[key]
+
+
+def clear_criteria():
+    global _generation
+
+    with _lock:
+        _generation += 1
+        _entries.pop(('criteria',), None)
+
+
+def clear():
+    clear_patterns()
+    clear_criteria()
+
+
+def invalidate(using=None, **kwargs):
+    """ signal receiver, invalidates the caches of all processes
+        once the current transaction commits. """
+
+    transaction.on_commit(_invalidate, using=using)
+
+
+def _invalidate():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    clear()
+
+
+def reset():
+    """ runs in a forked child, a thread of the parent
+        may have held the lock at the time of the fork. """
+
+    global _lock
+
+    _lock = threading.RLock()
+    _entries.clear()
@@ -0,0 +1,220 @@
+import gzip
+import json
+import zlib
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+
+from . import registry
+
+
+# A snapshot is a gzip compressed json lines file.
+# The first line describes the format, then every table starts with
+# a header object naming the model and its columns, followed by one
+# json array per row. Auto-created m2m through tables and the MPTT
+# tree columns are plain tables here, so restoring them needs neither
+# the model save() nor a tree rebuild.
+
+FORMAT = 'dnspool-snapshot'
+VERSION = 1
+
+SNAPSHOT_APPS = ['app', 'nameservice']
+
+BATCH_SIZE = 5000
+
+# errors of a missing, truncated or malformed snapshot file
+READ_ERRORS = (OSError, EOFError, zlib.error, ValueError, KeyError, ValidationError)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def get_models(app_labels=None):
+    """ returns the concrete models of the apps
+        including their auto-created through models. """
+
+    models = []
+    for label in app_labels or SNAPSHOT_APPS:
+        config = apps.get_app_config(label)
+        for model in config.get_models(include_auto_created=True):
+            if model._meta.proxy or not model._meta.managed:
+                continue
+            models.append(model)
+
+    return models
+
+
+def get_columns(model):
+    return [f.column for f in model._meta.local_concrete_fields]
+
+
+def dump(stream, app_labels=None, using=DEFAULT_DB_ALIAS):
+    """ writes the rows of all models to a text stream
+        and returns the number of rows per model label. """
+
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    connection = connections[using]
+    counts = {}
+
+    stream.write(encoder.encode({'format': FORMAT, 'version': VERSION}) + '\n')
+
+    # read all tables from one consistent snapshot of the database,
+    # a through table must not point to rows written after it was read.
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql' and outermost:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+
+        for model in get_models(app_labels):
+            opts = model._meta
+            attnames = [f.attname for f in opts.local_concrete_fields]
+
+            stream.write(encoder.encode({'model': opts.label_lower,
+                                         'columns': get_columns(model)}) + '\n')
+
+            rows = model._base_manager.using(using).order_by(opts.pk.attname) \
+                                      .values_list(*attnames).iterator(chunk_size=BATCH_SIZE)
+            count = 0
+            for row in rows:
+                stream.write(encoder.encode(row) + '\n')
+                count += 1
+
+            counts[opts.label_lower] = count
+
+    return counts
+
+
+def dump_file(path, app_labels=None, using=DEFAULT_DB_ALIAS):
+    with gzip.open(path, 'wt', encoding='utf-8') as stream:
+        return dump(stream, app_labels, using)
+
+
+def restore(stream, using=DEFAULT_DB_ALIAS):
+    """ bulk inserts the rows of a snapshot into empty tables
+        and returns the number of rows per model label. """
+
+    try:
+        counts = _restore(stream, using)
+    except IntegrityError as e:
+        raise SnapshotError("The snapshot violates a constraint: {0}".format(e)) from e
+    except READ_ERRORS as e:
+        raise SnapshotError("The snapshot can not be read: {0}: {1}".format(
+                            type(e).__name__, e)) from e
+
+    # the rows bypassed the model signals, other processes reload
+    # through the shared version key or after NAMESERVICE_CACHE_TTL.
+    registry.invalidate(using=using)
+
+    return counts
+
+
+def _restore(stream, using):
+
+    connection = connections[using]
+    counts = {}
+    models = []
+
+    header = json.loads(stream.readline() or '{}')
+    if not isinstance(header, dict) or header.get('format') != FORMAT \
+            or header.get('version') != VERSION:
+        raise SnapshotError("Not a {0} version {1} file.".format(FORMAT, VERSION))
+
+    with transaction.atomic(using=using):
+        with connection.constraint_checks_disabled():
+            with connection.cursor() as cursor:
+
+                table = None
+                for number, line in enumerate(stream, 2):
+                    data = json.loads(line)
+
+                    if isinstance(data, dict):
+                        if table:
+                            counts[table.label] = table.flush(cursor)
+                        model = get_snapshot_model(data['model'])
+                        table = SnapshotTable(model, data['columns'], connection)
+                        if model._base_manager.using(using).exists():
+                            raise SnapshotError("The table {0} is not empty.".format(
+                                                model._meta.db_table))
+                        models.append(model)
+                    elif not isinstance(data, list):
+                        raise SnapshotError("Line {0} is neither a table header nor a row.".format(
+                                            number))
+                    elif table:
+                        table.append(data, cursor, number)
+                    else:
+                        raise SnapshotError("Row without table header.")
+
+                if table:
+                    counts[table.label] = table.flush(cursor)
+
+                # set the sequences behind the restored primary keys
+                for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+        connection.check_constraints(table_names=[m._meta.db_table for m in models])
+
+    return counts
+
+
+def restore_file(path, using=DEFAULT_DB_ALIAS):
+    try:
+        stream = gzip.open(path, 'rt', encoding='utf-8')
+    except OSError as e:
+        raise SnapshotError("The snapshot can not be opened: {0}".format(e)) from e
+
+    with stream:
+        return restore(stream, using)
+
+
+def get_snapshot_model(label):
+    try:
+        return apps.get_model(label)
+    except LookupError:
+        raise SnapshotError("Unknown model {0}.".format(label))
+
+
+class SnapshotTable:
+    """ buffers the rows of one table and inserts
+        them with executemany in batches. """
+
+    def __init__(self, model, columns, connection):
+
+        fields = {f.column: f for f in model._meta.local_concrete_fields}
+        unknown = set(columns) - set(fields)
+        if unknown:
+            raise SnapshotError("Unknown columns of {0}: {1}".format(
+                                model._meta.label_lower, ", ".join(sorted(unknown))))
+
+        self.label = model._meta.label_lower
+        self.fields = [fields[c] for c in columns]
+        self.connection = connection
+        self.rows = []
+        self.count = 0
+
+        qn = connection.ops.quote_name
+        self.sql = "INSERT INTO {0} ({1}) VALUES ({2})".format(
+            qn(model._meta.db_table),
+            ", ".join(qn(c) for c in columns),
+            ", ".join(["%s"] * len(columns)))
+
+    def append(self, row, cursor, number):
+        if len(row) != len(self.fields):
+            raise SnapshotError("Line {0} of {1} has {2} values for {3} columns.".format(
+                                number, self.label, len(row), len(self.fields)))
+
+        self.rows.append([f.get_db_prep_save(f.to_python(v), self.connection)
+                          for f, v in zip(self.fields, row)])
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush(cursor)
+
+    def flush(self, cursor):
+        if self.rows:
+            cursor.executemany(self.sql, self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+        return self.count
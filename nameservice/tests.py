@@ -1,3 +1,283 @@
-from django.test import TestCase
+import gzip
+import io
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from app.models import Middleware, Subnet, SubnetParent
+
+from . import registry, snapshot
+from .models import (NameArtifacts,
+                     NameArtifactsCategory,
+                     NamePattern,
+                     NamePoolEntry,
+                     PoolType)
+
+
+class NamePoolEntryTest(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.pool_type = PoolType.objects.create(name="web")
+        NamePattern.objects.create(name="web", criteria=self.pool_type,
+                                   regex=r"(?P<env>[a-z]) (?P<num>\d+) (?P<site>[a-z]{2})?")
+        NameArtifactsCategory.objects.create(criteria="site", default="de")
+
+    def artifacts(self, entry):
+        return set(entry.nameartifacts_set.values_list('artifact', flat=True))
+
+    def test_match_creates_artifacts(self):
+        entry = NamePoolEntry(name="p01fr", pool_type=self.pool_type)
+        entry.save()
+
+        self.assertEqual(self.artifacts(entry), {"p", "01", "fr"})
+        self.assertEqual(set(NameArtifactsCategory.objects.values_list('criteria', flat=True)),
+                         {"env", "num", "site"})
+
+    def test_default_for_empty_group(self):
+        entry = NamePoolEntry(name="p01", pool_type=self.pool_type)
+        entry.save()
+
+        self.assertEqual(self.artifacts(entry), {"p", "01", "de"})
+
+    def test_no_match(self):
+        with self.assertRaises(ValidationError):
+            NamePoolEntry(name="XX", pool_type=self.pool_type).save()
+
+        self.assertFalse(NamePoolEntry.objects.exists())
+
+    def test_pattern_added_after_caching(self):
+        registry.get_patterns(self.pool_type.pk)
+        # the cache is not invalidated inside the test transaction
+        NamePattern.objects.create(name="db", criteria=self.pool_type,
+                                   regex=r"db (?P<num>\d+)")
+
+        entry = NamePoolEntry(name="db42", pool_type=self.pool_type)
+        entry.save()
+
+        self.assertEqual(self.artifacts(entry), {"42"})
+
+    def test_failed_artifacts_roll_back_entry(self):
+        other = NameArtifactsCategory.objects.create(criteria="other")
+        NameArtifacts.objects.create(artifact="p", criteria=other)
+
+        with self.assertRaises(IntegrityError):
+            NamePoolEntry(name="p01", pool_type=self.pool_type).save()
+
+        self.assertFalse(NamePoolEntry.objects.exists())
+
+
+class RegistryTest(TransactionTestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.pool_type = PoolType.objects.create(name="web")
+        self.pattern = NamePattern.objects.create(name="web", criteria=self.pool_type,
+                                                  regex=r"(?P<env>[a-z])")
+
+    def regexes(self):
+        return [r for r, c in registry.get_patterns(self.pool_type.pk)]
+
+    def test_pattern_save_clears_cache(self):
+        self.assertEqual(self.regexes(), [r"(?P<env>[a-z])"])
+
+        NamePattern.objects.create(name="db", criteria=self.pool_type, regex=r"db")
+
+        self.assertEqual(self.regexes(), [r"(?P<env>[a-z])", r"db"])
+
+    def test_pattern_delete_clears_cache(self):
+        self.assertEqual(self.regexes(), [r"(?P<env>[a-z])"])
+
+        self.pattern.delete()
+
+        self.assertEqual(self.regexes(), [])
+
+    def test_cleared_on_commit(self):
+        self.assertEqual(self.regexes(), [r"(?P<env>[a-z])"])
+
+        with transaction.atomic():
+            self.pattern.regex = r"db"
+            self.pattern.save()
+            self.assertEqual(self.regexes(), [r"(?P<env>[a-z])"])
+
+        self.assertEqual(self.regexes(), [r"db"])
+
+    def test_version_change_reloads(self):
+        self.assertEqual(self.regexes(), [r"(?P<env>[a-z])"])
+
+        # a change in another process bumps the version key
+        NamePattern.objects.filter(pk=self.pattern.pk).update(regex=r"db")
+        cache.set(registry.VERSION_KEY, "other", None)
+
+        self.assertEqual(self.regexes(), [r"db"])
+
+    def test_deleted_category_behind_cache(self):
+        NameArtifactsCategory.objects.create(criteria="env", default="")
+        registry.get_criteria()
+
+        # deleted by another process, the signals do not reach this one
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM nameservice_nameartifactscategory")
+
+        entry = NamePoolEntry(name="p", pool_type=self.pool_type)
+        entry.save()
+
+        self.assertEqual(list(entry.nameartifacts_set.values_list('artifact', flat=True)), ["p"])
+        self.assertTrue(NameArtifactsCategory.objects.filter(criteria="env").exists())
+
+    def test_warm_up_logs_failure(self):
+        NamePattern.objects.create(name="broken", criteria=self.pool_type, regex=r"(")
+
+        with self.assertLogs('nameservice.registry', 'ERROR'):
+            registry.warm_in_background().join()
+
+
+class StartupProfileTest(TestCase):
+
+    def test_reports_imports_and_warm_up(self):
+        stdout = io.StringIO()
+        call_command('startup_profile', stdout=stdout)
+
+        names = [line.split()[0] for line in stdout.getvalue().splitlines()
+                 if line.startswith("  ")]
+        for name in ("app", "nameservice", "mptt", "total", "patterns", "criteria"):
+            self.assertIn(name, names)
+
+    def test_failed_setup(self):
+        with mock.patch.dict(os.environ, {'DJANGO_SETTINGS_MODULE': 'missing.settings'}):
+            with self.assertRaises(CommandError):
+                call_command('startup_profile', stdout=io.StringIO())
+
+
+class SnapshotTest(TransactionTestCase):
+
+    def setUp(self):
+        registry.clear()
+        middleware = Middleware.objects.create(name="lb", identifier="lb")
+        root = SubnetParent.objects.create(name="root")
+        dmz = SubnetParent.objects.create(name="dmz", parent=root)
+        subnet = Subnet.objects.create(cidr="10.0.0.0/8", parent=dmz)
+        subnet.middlewares.add(middleware)
+
+        pool_type = PoolType.objects.create(name="web")
+        NamePattern.objects.create(name="web", criteria=pool_type,
+                                   regex=r"(?P<env>[a-z]) (?P<num>\d+)")
+        NamePoolEntry(name="p01", pool_type=pool_type).save()
+
+    def dump(self):
+        stream = io.StringIO()
+        snapshot.dump(stream)
+        stream.seek(0)
+        return stream
+
+    def delete_all(self):
+        for model in reversed(snapshot.get_models()):
+            model._base_manager.all().delete()
+
+    def test_round_trip(self):
+        stream = self.dump()
+        self.delete_all()
+
+        counts = snapshot.restore(stream)
+
+        self.assertEqual(counts['app.subnet_middlewares'], 1)
+        self.assertEqual(counts['nameservice.nameartifacts_related_entries'], 2)
+
+        dmz = SubnetParent.objects.get(name="dmz")
+        self.assertEqual((dmz.lft, dmz.rght, dmz.tree_id, dmz.level), (2, 3, 1, 1))
+        self.assertEqual(str(dmz), "root - dmz")
+        self.assertEqual(list(Subnet.objects.get().middlewares.values_list('name', flat=True)),
+                         ["lb"])
+        self.assertEqual(list(NameArtifacts.objects.get(artifact="p")
+                                            .related_entries.values_list('name', flat=True)),
+                         ["p01"])
+
+        # the sequences continue after the restored primary keys
+        SubnetParent.objects.create(name="core", parent=dmz)
+        NamePoolEntry(name="q02", pool_type=PoolType.objects.get()).save()
+
+        self.assertEqual(SubnetParent.objects.count(), 3)
+        self.assertEqual(NamePoolEntry.objects.count(), 2)
+
+    def test_refuses_non_empty_table(self):
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.restore(self.dump())
+
+        self.assertEqual(Middleware.objects.count(), 1)
+
+    def test_rejects_bad_header(self):
+        self.delete_all()
+
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.restore(io.StringIO('{"format":"other","version":1}\n'))
+
+    def test_rejects_dangling_foreign_key(self):
+        self.delete_all()
+        stream = io.StringIO(
+            '{"format":"dnspool-snapshot","version":1}\n'
+            '{"model":"app.subnet","columns":["id","cidr","parent_id","admin"]}\n'
+            '[1,"10.0.0.0/8",99,false]\n')
+
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.restore(stream)
+
+        self.assertFalse(Subnet.objects.exists())
+
+    def test_rejects_malformed_line(self):
+        stream = io.StringIO(
+            '{"format":"dnspool-snapshot","version":1}\n'
+            '{"model":"app.dnspoolentry",\n')
+
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.restore(stream)
+
+    def test_rejects_header_without_columns(self):
+        stream = io.StringIO(
+            '{"format":"dnspool-snapshot","version":1}\n'
+            '{"model":"app.dnspoolentry"}\n')
+
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.restore(stream)
+
+    def test_rejects_row_length(self):
+        for row in ('[1]', '[1,"a","b"]'):
+            stream = io.StringIO(
+                '{"format":"dnspool-snapshot","version":1}\n'
+                '{"model":"app.dnspoolentry","columns":["id","name"]}\n'
+                + row + '\n')
+
+            with self.assertRaisesRegex(snapshot.SnapshotError, "Line 3 of app.dnspoolentry"):
+                snapshot.restore(stream)
+
+    def test_rejects_unreadable_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "pool.jsonl.gz")
+            snapshot.dump_file(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            plain = os.path.join(tmp, "plain.jsonl")
+            with open(plain, 'wb') as f:
+                f.write(gzip.decompress(data))
+
+            truncated = os.path.join(tmp, "truncated.jsonl.gz")
+            with open(truncated, 'wb') as f:
+                f.write(data[:len(data) // 2])
+
+            self.delete_all()
+
+            for name in ("missing.jsonl.gz", plain, truncated):
+                with self.assertRaises(snapshot.SnapshotError):
+                    snapshot.restore_file(os.path.join(tmp, name))
+
+            self.assertFalse(Middleware.objects.exists())
+
+    def test_command_error(self):
+        with self.assertRaises(CommandError):
+            call_command('restore_snapshot', '/nonexistent/pool.jsonl.gz', stdout=io.StringIO())